@@ -0,0 +1,697 @@
+#!/usr/bin/env python3
+"""Installation monitor for the M3U Matrix desktop installer.
+
+Launches ``M3U_MATRIX_INSTALLER.bat``, retries transient failures,
+verifies the installed files, collects system diagnostics, and writes a
+full audit report next to the install directory.  Meant to be run from
+the user's Windows desktop (OneDrive-synced or local).
+"""
+
+import atexit
+import collections
+import concurrent.futures
+import json
+import logging
+import os
+import random
+import re
+import shutil
+import socket
+import stat
+import subprocess
+import sys
+import threading
+import time
+import traceback
+from datetime import datetime, timedelta
+from pathlib import Path
+
+# psutil is imported lazily inside run_system_diagnostics: it loads
+# native DLLs at import time, a startup cost that is pure waste whenever
+# the run aborts before the diagnostics stage.
+
+# orjson encodes several times faster than stdlib json and returns
+# ready-to-write bytes; fall back to stdlib when it is not installed.
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# python-json-logger is optional; its orjson formatter serializes ~5x
+# faster than stdlib json, but plain JSON lines are fine without it.
+try:
+    from pythonjsonlogger.orjson import OrjsonFormatter as _JsonFormatter
+except ImportError:
+    try:
+        from pythonjsonlogger.json import JsonFormatter as _JsonFormatter
+    except ImportError:
+        _JsonFormatter = None
+
+# Where the installer and its output live.  OneDrive relocates the
+# Desktop folder when backup is enabled, so prefer it when present.
+_ONEDRIVE_DESKTOP = Path.home() / "OneDrive" / "Desktop"
+DESKTOP = _ONEDRIVE_DESKTOP if _ONEDRIVE_DESKTOP.exists() else Path.home() / "Desktop"
+
+BAT_FILE = DESKTOP / "M3U_MATRIX_INSTALLER.bat"
+INSTALL_DIR = DESKTOP / "M3U_MATRIX_PRO"
+LOG_FILE = DESKTOP / "m3u_matrix_install.log"
+REPORT_FILE = DESKTOP / "m3u_matrix_install_report.txt"
+DIAGNOSTICS_FILE = DESKTOP / "m3u_matrix_diagnostics.json"
+
+# Files the installer is expected to drop into INSTALL_DIR.
+EXPECTED_FILES = [
+    "M3U_MATRIX_PRO.py",
+    "launcher.py",
+    "requirements.txt",
+    "README.txt",
+    "config/settings.json",
+    "config/channels.json",
+    "assets/logo.png",
+    "assets/icon.ico",
+    "playlists/default.m3u",
+    "tools/validator.py",
+    "tools/epg_grabber.py",
+    "uninstall.bat",
+]
+
+# Retry/backoff tuning for run_installer_with_retries.
+BASE_DELAY = 1.0   # seconds before the first retry
+MAX_DELAY = 30.0   # cap on the exponential schedule
+JITTER = 0.5       # up to +50% random spread so retries don't line up
+
+# Content markers a genuine installer bat should contain.  Extend the
+# tuple as the installer evolves: the compiled alternation acts as a
+# single-pass multi-pattern matcher, so the scan stays one pass over
+# the file no matter how many markers are listed.
+KEY_MARKERS = (b"@echo off", b"M3U Matrix", b"pip install", b"python")
+MARKER_RE = re.compile(b"|".join(re.escape(m) for m in KEY_MARKERS), re.IGNORECASE)
+
+# Exit codes that retrying cannot fix: 9009 is cmd's "not recognized as
+# an internal or external command", 2/3 are file/path-not-found.
+UNRECOVERABLE_CODES = {9009, 2, 3}
+# A nonzero exit this fast means the bat never really ran (syntax error,
+# missing interpreter) rather than a transient failure mid-install.
+MIN_RUNTIME = 2.0
+
+# Kill the installer once it has been silent this long.  An idle timeout
+# tolerates slow-but-productive installs (pip building wheels on a cold
+# cache) while catching a hung installer far sooner than an absolute
+# budget would.
+IDLE_TIMEOUT = 60.0
+
+
+# Wall-clock anchor paired with a monotonic zero: the tracker's hot
+# paths record cheap monotonic floats and only the report stage renders
+# them as ISO timestamps.
+_T0 = datetime.now()
+_MT0 = time.monotonic()
+
+
+def _isotime(offset):
+    """Render a monotonic offset (seconds since start) as an ISO stamp."""
+    return (_T0 + timedelta(seconds=offset)).isoformat()
+
+
+class ErrorTracker:
+    """Collects steps, errors and warnings for the final audit report.
+
+    Event times are stored as monotonic offsets from process start;
+    ``_isotime`` turns them back into wall-clock stamps at report time.
+    """
+
+    def __init__(self):
+        self.steps = []
+        # Bounded so a pathological retry loop cannot grow the audit
+        # without limit; the counters keep exact totals past the cap.
+        self.errors = collections.deque(maxlen=500)
+        self.warnings = collections.deque(maxlen=500)
+        self.retries = []
+        self.error_severities = collections.Counter()
+        self.error_categories = collections.Counter()
+        self.warning_categories = collections.Counter()
+        self.start_time = _T0
+
+    @property
+    def total_errors(self):
+        return sum(self.error_severities.values())
+
+    @property
+    def total_warnings(self):
+        return sum(self.warning_categories.values())
+
+    def add_step(self, name, status, details=""):
+        self.steps.append({
+            "time": time.monotonic() - _MT0,
+            "name": name,
+            "status": status,
+            "details": details,
+        })
+
+    def add_error(self, category, message, severity="ERROR", exception=None):
+        entry = {
+            "time": time.monotonic() - _MT0,
+            "category": category,
+            "message": message,
+            "severity": severity,
+        }
+        if exception is not None:
+            entry["traceback"] = "".join(
+                traceback.format_exception(type(exception), exception, exception.__traceback__)
+            )
+        self.errors.append(entry)
+        self.error_severities[severity] += 1
+        self.error_categories[category] += 1
+        safe_log(f"{category}: {message}", severity)
+
+    def add_warning(self, category, message):
+        self.warnings.append({
+            "time": time.monotonic() - _MT0,
+            "category": category,
+            "message": message,
+        })
+        self.warning_categories[category] += 1
+        safe_log(f"{category}: {message}", "WARNING")
+
+
+class _AuditHandler(logging.StreamHandler):
+    """StreamHandler that keeps routine lines in the write buffer.
+
+    The stock handler flushes after every record; here INFO lines stay
+    buffered and only records worth investigating are forced to disk,
+    so a crash still leaves the interesting lines in the log.
+    """
+
+    def emit(self, record):
+        try:
+            self.stream.write(self.format(record) + self.terminator)
+            if record.levelno >= logging.WARNING:
+                self.stream.flush()
+        except Exception:
+            self.handleError(record)
+
+
+class _PlainJsonFormatter(logging.Formatter):
+    """Fallback NDJSON formatter when python-json-logger is absent."""
+
+    def format(self, record):
+        return json.dumps({
+            "asctime": self.formatTime(record),
+            "levelname": record.levelname,
+            "message": record.getMessage(),
+        }, separators=(",", ":"))
+
+
+def _open_log():
+    """Open the audit logger once; reopening per line costs ~3 syscalls
+    plus a directory lock on Windows for every message."""
+    try:
+        LOG_FILE.parent.mkdir(parents=True, exist_ok=True)
+        fh = open(LOG_FILE, "a", encoding="utf-8", buffering=8192)
+    except OSError:
+        return None
+    atexit.register(fh.close)
+    handler = _AuditHandler(fh)
+    if _JsonFormatter is not None:
+        handler.setFormatter(_JsonFormatter("%(asctime)s %(levelname)s %(message)s"))
+    else:
+        handler.setFormatter(_PlainJsonFormatter())
+    logger = logging.getLogger("m3u_matrix_monitor")
+    logger.setLevel(logging.INFO)
+    logger.addHandler(handler)
+    logger.propagate = False
+    return logger
+
+
+_LOG_LEVELS = {
+    "INFO": logging.INFO,
+    "WARNING": logging.WARNING,
+    "ERROR": logging.ERROR,
+    "CRITICAL": logging.CRITICAL,
+}
+
+_audit_logger = _open_log()
+
+
+def safe_log(message, level="INFO"):
+    """Emit one JSON line to the install log; never raise from logging."""
+    print(f"{level}: {message}")
+    if _audit_logger is None:
+        return
+    try:
+        _audit_logger.log(_LOG_LEVELS.get(level, logging.INFO), message)
+    except OSError:
+        pass
+
+
+error_tracker = ErrorTracker()
+
+
+def verify_installer_comprehensive():
+    """Sanity-check the installer bat before running it."""
+    error_tracker.add_step("Verify installer", "started")
+    if not BAT_FILE.exists():
+        error_tracker.add_error(
+            "Installer Verification",
+            f"Installer not found: {BAT_FILE}",
+            severity="CRITICAL",
+        )
+        return False
+
+    size = BAT_FILE.stat().st_size
+    if size == 0:
+        error_tracker.add_error(
+            "Installer Verification", "Installer bat file is empty", severity="CRITICAL"
+        )
+        return False
+
+    try:
+        data = BAT_FILE.read_bytes()
+    except OSError as exc:
+        error_tracker.add_error(
+            "Installer Verification", f"Could not read installer: {exc}", exception=exc
+        )
+        return False
+
+    markers_found = sorted(
+        {m.group(0).lower().decode("ascii") for m in MARKER_RE.finditer(data)}
+    )
+    if len(markers_found) < 2:
+        error_tracker.add_warning(
+            "Installer Verification",
+            f"Only {len(markers_found)}/{len(KEY_MARKERS)} expected markers found",
+        )
+
+    error_tracker.add_step(
+        "Verify installer", "success", f"{size} bytes, markers: {markers_found}"
+    )
+    return True
+
+
+def _pump_installer_output(stream, activity):
+    """Relay installer output lines into the audit log as they appear.
+
+    ``activity`` is a single-element list updated with the time of the
+    last line received, which the main loop uses for its idle timeout.
+    """
+    for line in stream:
+        activity[0] = time.monotonic()
+        line = line.rstrip()
+        if line:
+            safe_log(f"[INSTALLER] {line}")
+
+
+def run_installer_with_retries(max_attempts=3):
+    """Run the installer bat, retrying transient failures with backoff."""
+    for attempt in range(1, max_attempts + 1):
+        safe_log(f"Installer attempt {attempt}/{max_attempts}")
+        error_tracker.add_step(f"Installer attempt {attempt}", "started")
+        attempt_start = time.monotonic()
+        try:
+            # Piping stdout instead of spawning a separate console gives
+            # the monitor visibility into installer progress and keeps
+            # the output in the audit log.
+            proc = subprocess.Popen(
+                ["cmd", "/c", str(BAT_FILE)],
+                stdout=subprocess.PIPE,
+                stderr=subprocess.STDOUT,
+                cwd=str(DESKTOP),
+                bufsize=1,
+                text=True,
+                encoding="utf-8",
+                errors="replace",
+            )
+        except OSError as exc:
+            error_tracker.add_error(
+                "Installer Launch", f"Could not start installer: {exc}", exception=exc
+            )
+            return False
+
+        activity = [time.monotonic()]
+        threading.Thread(
+            target=_pump_installer_output, args=(proc.stdout, activity), daemon=True
+        ).start()
+
+        return_code = None
+        while True:
+            try:
+                # Blocks in the OS until the process exits, so completion
+                # is seen immediately instead of on the next 1s poll tick.
+                proc.wait(timeout=30)
+                return_code = proc.returncode
+                break
+            except subprocess.TimeoutExpired:
+                idle = time.monotonic() - activity[0]
+                if idle > IDLE_TIMEOUT:
+                    safe_log(
+                        f"No installer output for {idle:.0f}s, terminating",
+                        "WARNING",
+                    )
+                    proc.terminate()
+                    return_code = proc.wait()
+                    break
+                safe_log(
+                    f"Installer still running "
+                    f"({time.monotonic() - attempt_start:.0f}s elapsed)"
+                )
+
+        if return_code == 0:
+            error_tracker.add_step(f"Installer attempt {attempt}", "success")
+            return True
+
+        elapsed = time.monotonic() - attempt_start
+        if return_code in UNRECOVERABLE_CODES or elapsed < MIN_RUNTIME:
+            # Deterministic failure; retrying would just repeat it and
+            # burn max_attempts * (run time + backoff) for nothing.
+            error_tracker.add_error(
+                "Installer Run",
+                f"Installer failed with unrecoverable exit code {return_code} "
+                f"after {elapsed:.1f}s; not retrying",
+                severity="CRITICAL",
+            )
+            return False
+
+        error_tracker.add_error(
+            "Installer Run",
+            f"Installer exited with code {return_code} on attempt {attempt}",
+            severity="ERROR" if attempt == max_attempts else "WARNING",
+        )
+        if attempt < max_attempts:
+            # Exponential backoff with jitter: transient blockers (AV scan,
+            # OneDrive sync lock) usually clear within seconds, so the first
+            # retry comes quickly, while the jitter keeps repeated attempts
+            # from synchronizing against the same blocker.
+            delay = min(MAX_DELAY, BASE_DELAY * (2 ** (attempt - 1)))
+            delay *= 1 + random.uniform(0, JITTER)
+            error_tracker.retries.append({
+                "attempt": attempt,
+                "return_code": return_code,
+                "delay": round(delay, 2),
+            })
+            safe_log(f"Retrying in {delay:.1f}s", "WARNING")
+            time.sleep(delay)
+
+    return False
+
+
+# Set once prepare_install_dir has run, so later stages don't have to
+# stat the install path again just to know it exists.
+_INSTALL_DIR_READY = False
+
+
+def _move_to_trash(path):
+    """Rename *path* aside in O(1) and delete it in the background.
+
+    Renaming frees the path immediately; the per-file deletion (slow
+    under Defender and OneDrive) then overlaps with the installer run
+    instead of blocking it.
+    """
+    trash = path.with_name(f"{path.name}.trash-{os.getpid()}")
+    os.replace(path, trash)
+    threading.Thread(
+        target=shutil.rmtree,
+        args=(trash,),
+        kwargs={"ignore_errors": True},
+        daemon=True,
+    ).start()
+
+
+def prepare_install_dir(path=INSTALL_DIR):
+    """Ensure an empty install directory with one stat of the path."""
+    global _INSTALL_DIR_READY
+    try:
+        st = os.stat(path)
+    except FileNotFoundError:
+        path.mkdir(parents=True)
+        _INSTALL_DIR_READY = True
+        return
+    if stat.S_ISDIR(st.st_mode):
+        safe_log("Removing previous installation")
+        try:
+            _move_to_trash(path)
+        except OSError:
+            shutil.rmtree(path, ignore_errors=True)
+    else:
+        path.unlink()
+    path.mkdir(parents=True, exist_ok=True)
+    _INSTALL_DIR_READY = True
+
+
+def _scan_install_dir(root):
+    """One traversal returning ``(total_size, {relative path: size})``.
+
+    DirEntry caches the type and stat data returned by the directory
+    read, so this costs one syscall per entry, and the same pass feeds
+    both the footprint total and the expected-file lookup — the tree is
+    never walked or stat'ed twice.
+    """
+    root = os.fspath(root)
+    prefix_len = len(root) + len(os.sep)
+    present = {}
+    total = 0
+    stack = [root]
+    while stack:
+        try:
+            with os.scandir(stack.pop()) as it:
+                for entry in it:
+                    if entry.is_dir(follow_symlinks=False):
+                        stack.append(entry.path)
+                    elif entry.is_file(follow_symlinks=False):
+                        size = entry.stat().st_size
+                        present[entry.path[prefix_len:]] = size
+                        total += size
+        except OSError:
+            continue
+    return total, present
+
+
+def verify_installation_comprehensive():
+    """Check every expected file and measure the installed footprint."""
+    error_tracker.add_step("Verify installation", "started")
+    result = {
+        "files_found": [],
+        "files_missing": [],
+        "files_partial": [],
+        "total_size": 0,
+    }
+    if not _INSTALL_DIR_READY and not INSTALL_DIR.exists():
+        error_tracker.add_error(
+            "Installation Verification",
+            f"Install directory missing: {INSTALL_DIR}",
+            severity="CRITICAL",
+        )
+        return result
+
+    total_size, present = _scan_install_dir(INSTALL_DIR)
+    result["total_size"] = total_size
+    for rel in EXPECTED_FILES:
+        size = present.get(rel.replace("/", os.sep))
+        if size is None:
+            result["files_missing"].append(rel)
+        elif size == 0:
+            result["files_partial"].append(rel)
+        else:
+            result["files_found"].append(rel)
+
+    for rel in result["files_missing"]:
+        error_tracker.add_error("Installation Verification", f"Missing file: {rel}")
+    for rel in result["files_partial"]:
+        error_tracker.add_warning("Installation Verification", f"Empty file: {rel}")
+
+    status = "success" if not result["files_missing"] else "failed"
+    error_tracker.add_step(
+        "Verify installation",
+        status,
+        f"{len(result['files_found'])}/{len(EXPECTED_FILES)} files, "
+        f"{total_size} bytes total",
+    )
+    return result
+
+
+def run_system_diagnostics():
+    """Gather environment facts that help triage a failed install."""
+    error_tracker.add_step("System diagnostics", "started")
+    diagnostics = {"timestamp": datetime.now().isoformat()}
+
+    def _net_check():
+        # A raw TCP connect to a public DNS resolver answers "are we
+        # online" in one round trip with zero payload — no DNS lookup,
+        # no TLS handshake and no response body to download.
+        try:
+            socket.create_connection(("1.1.1.1", 53), timeout=2).close()
+            return True
+        except OSError:
+            return False
+
+    def _disk_check():
+        import psutil
+
+        mem = psutil.virtual_memory()
+        disk = psutil.disk_usage(str(DESKTOP))
+        return mem.available // (1024 * 1024), disk.free // (1024 * 1024)
+
+    def _py_check():
+        return {
+            "python_version": sys.version,
+            "platform": sys.platform,
+            "sys_path": list(sys.path),
+        }
+
+    # The probes are independent, so overlap them; total wall time is
+    # bounded by the slowest probe instead of their sum.
+    executor = concurrent.futures.ThreadPoolExecutor(max_workers=3)
+    futures = {
+        executor.submit(_net_check): "network",
+        executor.submit(_disk_check): "disk",
+        executor.submit(_py_check): "python",
+    }
+    done, _ = concurrent.futures.wait(futures, timeout=12)
+    executor.shutdown(wait=False)
+    for future in done:
+        name = futures[future]
+        try:
+            value = future.result()
+        except Exception as exc:
+            error_tracker.add_warning("Diagnostics", f"{name} check failed: {exc}")
+            continue
+        if name == "network":
+            diagnostics["internet_access"] = value
+            if not value:
+                error_tracker.add_warning("Network", "No internet access detected")
+        elif name == "disk":
+            diagnostics["memory_available_mb"], diagnostics["disk_free_mb"] = value
+            if diagnostics["disk_free_mb"] < 500:
+                error_tracker.add_warning(
+                    "Disk", f"Low disk space: {diagnostics['disk_free_mb']} MB free"
+                )
+        else:
+            diagnostics.update(value)
+
+    try:
+        if orjson is not None:
+            DIAGNOSTICS_FILE.write_bytes(
+                orjson.dumps(diagnostics, option=orjson.OPT_INDENT_2)
+            )
+        else:
+            DIAGNOSTICS_FILE.write_bytes(
+                json.dumps(diagnostics, indent=2).encode("utf-8")
+            )
+    except OSError as exc:
+        error_tracker.add_warning("Diagnostics", f"Could not write diagnostics: {exc}")
+
+    error_tracker.add_step("System diagnostics", "success")
+    return diagnostics
+
+
+def generate_comprehensive_report(verification=None, diagnostics=None):
+    """Render the audit trail into a human-readable report file."""
+    elapsed = (datetime.now() - error_tracker.start_time).total_seconds()
+    # Accumulate fragments and join once at the end; repeated += on a
+    # string is quadratic in total bytes for large audits.
+    parts = [f"""M3U MATRIX INSTALLATION REPORT
+{'=' * 60}
+Started : {error_tracker.start_time.isoformat()}
+Elapsed : {elapsed:.1f}s
+Steps   : {len(error_tracker.steps)}
+Errors  : {error_tracker.total_errors}
+Warnings: {error_tracker.total_warnings}
+
+"""]
+
+    parts.append("STEPS\n-----\n")
+    for step in error_tracker.steps:
+        parts.append(f"[{_isotime(step['time'])}] {step['name']}: {step['status']}")
+        if step["details"]:
+            parts.append(f" ({step['details']})")
+        parts.append("\n")
+
+    if error_tracker.errors:
+        parts.append("\nERRORS\n------\n")
+        if error_tracker.total_errors > len(error_tracker.errors):
+            parts.append(f"(showing the most recent {len(error_tracker.errors)})\n")
+        for error in error_tracker.errors:
+            parts.append(
+                f"[{_isotime(error['time'])}] {error['severity']} "
+                f"{error['category']}: {error['message']}\n"
+            )
+            if "traceback" in error:
+                parts.append(error["traceback"] + "\n")
+
+    if error_tracker.warnings:
+        parts.append("\nWARNINGS\n--------\n")
+        for warning in error_tracker.warnings:
+            parts.append(
+                f"[{_isotime(warning['time'])}] {warning['category']}: "
+                f"{warning['message']}\n"
+            )
+
+    if error_tracker.retries:
+        parts.append("\nRETRIES\n-------\n")
+        for retry in error_tracker.retries:
+            parts.append(
+                f"attempt {retry['attempt']}: exit {retry['return_code']}, "
+                f"waited {retry['delay']}s\n"
+            )
+
+    if verification is not None:
+        parts.append("\nVERIFICATION\n------------\n")
+        parts.append(f"Found   : {len(verification['files_found'])}\n")
+        parts.append(f"Missing : {len(verification['files_missing'])}\n")
+        parts.append(f"Partial : {len(verification['files_partial'])}\n")
+        parts.append(f"Size    : {verification['total_size']} bytes\n")
+
+    parts.append("\nRECOMMENDATIONS\n---------------\n")
+    # The tracker maintains category/severity counters as events arrive,
+    # so no scan over the event lists is needed here.
+    error_categories = error_tracker.error_categories
+    warning_categories = error_tracker.warning_categories
+    if any("Network" in c for c in error_categories) or any(
+        "Network" in c for c in warning_categories
+    ):
+        parts.append("- Check your internet connection and re-run the installer.\n")
+    if any("Disk" in c for c in warning_categories):
+        parts.append("- Free up disk space before reinstalling.\n")
+    if error_tracker.error_severities["CRITICAL"]:
+        parts.append("- A critical error occurred; see the ERRORS section above.\n")
+    if any("Installer Run" in c for c in error_categories):
+        parts.append("- The installer itself failed; check its console output.\n")
+    if not error_tracker.total_errors:
+        parts.append("- Installation completed without errors.\n")
+
+    report = "".join(parts)
+    try:
+        # Pre-encode and write the bytes in one call: no TextIOWrapper
+        # layer, no incremental codec, a single write syscall.
+        REPORT_FILE.write_bytes(report.encode("utf-8"))
+        safe_log(f"Report written to {REPORT_FILE}")
+    except OSError as exc:
+        safe_log(f"Could not write report: {exc}", "ERROR")
+    return report
+
+
+def main():
+    safe_log("=== M3U Matrix installation monitor started ===")
+
+    if not verify_installer_comprehensive():
+        generate_comprehensive_report()
+        return 1
+
+    diagnostics = run_system_diagnostics()
+
+    prepare_install_dir()
+
+    installed = run_installer_with_retries()
+    verification = verify_installation_comprehensive() if installed else None
+    generate_comprehensive_report(verification, diagnostics)
+
+    if not installed:
+        safe_log("Installation failed", "ERROR")
+        return 1
+    if verification and verification["files_missing"]:
+        safe_log("Installation incomplete", "ERROR")
+        return 1
+    safe_log("Installation completed successfully")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())